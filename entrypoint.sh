@@ -1,4 +1,4 @@
 #!/bin/sh
 
 cd /opt/opencti-connector-vigilintel || exit 1
-python main.py
+exec python main.py
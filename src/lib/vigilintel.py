@@ -1,15 +1,63 @@
 """VigilIntel STIX Importer - Core connector logic."""
 
+import asyncio
+import contextlib
+import gzip
 import json
+import mmap
 import os
+import re
 import sys
+import threading
 import time
-from datetime import datetime, timedelta, timezone
+import uuid
+import zlib
+from datetime import date, datetime, timedelta, timezone
 
-import requests
+import aiohttp
 import yaml
 from pycti import OpenCTIConnectorHelper, get_config_variable
 
+# Fastest available JSON codec: orjson, then msgspec, ujson and finally
+# the standard library.  _json_loads accepts bytes, _json_dumps returns str.
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _JSON_DECODE_ERRORS = (orjson.JSONDecodeError,)
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+except ImportError:  # pragma: no cover - platforms without orjson wheels
+    try:
+        import msgspec
+
+        _json_loads = msgspec.json.decode
+        _JSON_DECODE_ERRORS = (msgspec.DecodeError,)
+
+        def _json_dumps(obj) -> str:
+            return msgspec.json.encode(obj).decode("utf-8")
+
+    except ImportError:
+        try:
+            import ujson
+
+            _json_loads = ujson.loads
+            _json_dumps = ujson.dumps
+            _JSON_DECODE_ERRORS = (ValueError,)
+        except ImportError:
+            _json_loads = json.loads
+            _json_dumps = json.dumps
+            _JSON_DECODE_ERRORS = (ValueError,)
+
+try:
+    import brotli  # noqa: F401 - enables aiohttp's Brotli decoder
+
+    _ACCEPT_ENCODING = "gzip, br"
+except ImportError:  # pragma: no cover - gzip only without Brotli support
+    _ACCEPT_ENCODING = "gzip"
+
 
 class VigilIntelConnector:
     """OpenCTI external-import connector for VigilIntel STIX reports.
@@ -25,6 +73,66 @@ class VigilIntelConnector:
         "/{year}/{month}/{year}-{month}-{day}-report.stix_{lang}.json"
     )
 
+    # Connector settings: name -> (env variable, YAML path, default)
+    _SETTINGS = {
+        "language": ("VIGILINTEL_LANGUAGE", ["vigilintel", "language"], "fr"),
+        "lookback_days": (
+            "VIGILINTEL_LOOKBACK_DAYS",
+            ["vigilintel", "lookback_days"],
+            "7",
+        ),
+        "interval_hours": (
+            "VIGILINTEL_INTERVAL_HOURS",
+            ["vigilintel", "interval_hours"],
+            "24",
+        ),
+        "base_url": ("VIGILINTEL_BASE_URL", ["vigilintel", "base_url"], _BASE_URL),
+        "cache_dir": ("VIGILINTEL_CACHE_DIR", ["vigilintel", "cache_dir"], ""),
+        "batch_size": ("VIGILINTEL_BATCH_SIZE", ["vigilintel", "batch_size"], "4"),
+    }
+
+    # Headers sent with every download; STIX JSON compresses very well
+    _HTTP_HEADERS = {
+        "Accept-Encoding": _ACCEPT_ENCODING,
+        "User-Agent": "VigilIntel-OpenCTI/1.0",
+    }
+
+    # Maximum number of reports downloaded in parallel
+    _MAX_CONCURRENT_DOWNLOADS = 8
+
+    # Size of the keep-alive connection pool shared by all downloads
+    _CONNECTION_POOL_SIZE = 16
+
+    # Retries of a download on timeouts, connection errors and 5xx answers,
+    # with exponential backoff (0.5s, 1s, 2s, 4s)
+    _MAX_RETRIES = 4
+    _RETRY_BACKOFF = 0.5
+    _RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+    # Sentinel returned by _download_report when the server answers 304
+    _NOT_MODIFIED = object()
+    # Sentinel for a JSON body that is not a STIX bundle
+    _INVALID = object()
+    # Sentinel for a download that still failed after all retries
+    _FAILED = object()
+
+    # Already-imported reports of the last N days (today included) are
+    # re-probed with If-None-Match to pick up republished versions
+    _RECHECK_DAYS = 2
+
+    # Cheap pre-parse check for a STIX bundle's type marker
+    _BUNDLE_MARKER = re.compile(rb'"type"\s*:\s*"bundle"')
+    # Bytes inspected at each end of a body for the marker
+    _BUNDLE_MARKER_WINDOW = 512
+
+    # Cached report bodies older than this are re-downloaded (seconds)
+    _CACHE_MAX_AGE = 25 * 3600
+    _CACHE_COMPRESS_LEVEL = 1
+    # Names of cache entries (and leftover temporary files) we may prune
+    _CACHE_ENTRY = re.compile(
+        r"\d{4}-\d{2}-\d{2}_[a-z]{2}\.json\.gz(\.tmp|\.etag)?"
+    )
+
     def __init__(self):
         """Initialize the connector, read configuration, and set up helper."""
 
@@ -41,159 +149,431 @@ class VigilIntelConnector:
         self.helper = OpenCTIConnectorHelper(config)
 
         # ── Connector-specific settings ────────────────────────────────
-        self.language = get_config_variable(
-            "VIGILINTEL_LANGUAGE",
-            ["vigilintel", "language"],
-            config,
-            default="fr",
-        )
+        settings = self._read_settings(config)
+
+        self.language = settings["language"]
         if self.language not in ("fr", "en"):
             self.helper.connector_logger.warning(
                 f"[VigilIntel] Invalid VIGILINTEL_LANGUAGE '{self.language}', defaulting to 'fr'."
             )
             self.language = "fr"
 
-        self.lookback_days = int(
-            get_config_variable(
-                "VIGILINTEL_LOOKBACK_DAYS",
-                ["vigilintel", "lookback_days"],
-                config,
-                default="7",
-            )
-        )
+        self.lookback_days = int(settings["lookback_days"])
+        self.interval_hours = int(settings["interval_hours"])
+        self.base_url = settings["base_url"]
 
-        self.interval_hours = int(
-            get_config_variable(
-                "VIGILINTEL_INTERVAL_HOURS",
-                ["vigilintel", "interval_hours"],
-                config,
-                default="24",
+        # Reports merged into each OpenCTI submission; state is saved after
+        # each one, so a batch is what gets replayed after a crash.
+        self.batch_size = int(settings["batch_size"])
+        if self.batch_size < 1:
+            self.helper.connector_logger.warning(
+                f"[VigilIntel] Invalid VIGILINTEL_BATCH_SIZE '{self.batch_size}', defaulting to 1."
             )
-        )
+            self.batch_size = 1
 
-        self.base_url = get_config_variable(
-            "VIGILINTEL_BASE_URL",
-            ["vigilintel", "base_url"],
-            config,
-            default=self._BASE_URL,
-        )
+        # Optional on-disk cache of downloaded reports (disabled when empty)
+        self.cache_dir = settings["cache_dir"]
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Set on shutdown request to interrupt the sleep between runs
+        self._shutdown = threading.Event()
 
         self.helper.connector_logger.info(
             f"[VigilIntel] Connector initialised — language={self.language}, "
             f"lookback={self.lookback_days} days, interval={self.interval_hours}h"
         )
 
+    # ─── Configuration ────────────────────────────────────────────────
+
+    @classmethod
+    def _read_settings(cls, config: dict) -> dict:
+        """Read every connector setting in one pass over ``_SETTINGS``."""
+        return {
+            name: get_config_variable(env_var, yaml_path, config, default=default)
+            for name, (env_var, yaml_path, default) in cls._SETTINGS.items()
+        }
+
     # ─── URL helpers ──────────────────────────────────────────────────
 
-    def _build_url(self, target_date: datetime) -> str:
+    def _build_url(self, target_date: date) -> str:
         """Build the raw GitHub URL for a given date and configured language."""
+        year, month, day = target_date.isoformat().split("-")
         return self.base_url.format(
-            year=target_date.strftime("%Y"),
-            month=target_date.strftime("%m"),
-            day=target_date.strftime("%d"),
-            lang=self.language,
+            year=year, month=month, day=day, lang=self.language
         )
 
     # ─── Date range helpers ───────────────────────────────────────────
 
-    def _compute_date_range(self) -> list[datetime]:
+    @staticmethod
+    def _read_last_processed_date(state: dict | None) -> date | None:
+        """Return the last processed date persisted in state, if any."""
+        if not state or "last_processed_date" not in state:
+            return None
+        try:
+            return datetime.fromisoformat(state["last_processed_date"]).date()
+        except (ValueError, TypeError):
+            return None
+
+    def _compute_date_range(self) -> list[date]:
         """Determine which dates to process.
 
         If the connector has never run (no persisted state), we look back
         ``lookback_days`` into the past.  Otherwise we only fetch from the
         day after the last successfully processed date up to today.
 
-        Returns a list of ``datetime`` objects in chronological order.
+        Returns a list of ``date`` objects in chronological order.
         """
-        today = datetime.now(timezone.utc).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-
-        # Read persisted state
-        state = self.helper.get_state()
-        last_processed = None
-        if state and "last_processed_date" in state:
-            try:
-                last_processed = datetime.fromisoformat(
-                    state["last_processed_date"]
-                ).replace(tzinfo=timezone.utc)
-            except (ValueError, TypeError):
-                last_processed = None
+        today = datetime.now(timezone.utc).date()
+        last_processed = self._read_last_processed_date(self.helper.get_state())
 
         if last_processed is None:
             # First run → backfill
             start_date = today - timedelta(days=self.lookback_days)
             self.helper.connector_logger.info(
                 f"[VigilIntel] First run detected — backfilling from "
-                f"{start_date.strftime('%Y-%m-%d')} to {today.strftime('%Y-%m-%d')}"
+                f"{start_date.isoformat()} to {today.isoformat()}"
             )
         else:
             start_date = last_processed + timedelta(days=1)
             if start_date > today:
                 self.helper.connector_logger.info(
-                    f"[VigilIntel] Already up-to-date (last processed: {last_processed.strftime('%Y-%m-%d')})."
+                    f"[VigilIntel] Already up-to-date (last processed: {last_processed.isoformat()})."
                 )
                 return []
 
-        dates = []
-        current = start_date
-        while current <= today:
-            dates.append(current)
-            current += timedelta(days=1)
+        nb_days = (today - start_date).days + 1
+        if nb_days < 1:
+            return []
+        return [start_date + timedelta(days=i) for i in range(nb_days)]
 
-        return dates
+    def _compute_recheck_dates(
+        self, dates: list[date], etags: dict[str, str]
+    ) -> list[date]:
+        """Return recent, already-imported dates to re-probe for updates.
 
-    # ─── Download & validate ──────────────────────────────────────────
+        Only dates with a stored ETag qualify, so the probe is a cheap
+        conditional request answered by a 304 when nothing changed.
+        """
+        today = datetime.now(timezone.utc).date()
+        window = [
+            today - timedelta(days=i)
+            for i in range(self._RECHECK_DAYS - 1, -1, -1)
+        ]
+        return [d for d in window if d.isoformat() in etags and d not in dates]
+
+    # ─── Report cache ─────────────────────────────────────────────────
+
+    def _cache_path(self, target_date: date) -> str:
+        """Return the cache file path for a given date and language."""
+        return os.path.join(
+            self.cache_dir,
+            f"{target_date.isoformat()}_{self.language}.json.gz",
+        )
 
-    def _download_report(self, url: str) -> dict | None:
-        """Download a STIX bundle from the given URL.
+    def _read_cache(self, target_date: date) -> tuple[bytes, str | None] | None:
+        """Return the cached ``(raw, etag)`` for a date, or ``None`` on miss.
 
-        Returns the parsed JSON dict, or ``None`` on failure.
+        ``etag`` comes from the ``.etag`` file stored next to the entry, so
+        reports imported from the cache can still be re-probed later.
+        Entries older than ``_CACHE_MAX_AGE`` are treated as misses.
         """
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(target_date)
         try:
-            self.helper.connector_logger.info(f"[VigilIntel] Fetching {url}")
-            response = requests.get(url, timeout=30)
+            if time.time() - os.path.getmtime(path) >= self._CACHE_MAX_AGE:
+                return None
+            with open(path, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mm:
+                raw = gzip.decompress(mm)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, zlib.error) as e:
+            self.helper.connector_logger.warning(
+                f"[VigilIntel] Ignoring unreadable cache entry {path}: {e}"
+            )
+            return None
 
-            if response.status_code == 404:
-                self.helper.connector_logger.warning(
-                    f"[VigilIntel] Report not found (404): {url}"
+        try:
+            with open(f"{path}.etag", "r") as f:
+                etag = f.read().strip() or None
+        except OSError:
+            etag = None
+        return raw, etag
+
+    def _write_cache(
+        self, target_date: date, raw: bytes, etag: str | None
+    ) -> None:
+        """Atomically store a raw report, and its ETag, in the cache."""
+        if not self.cache_dir:
+            return
+        path = self._cache_path(target_date)
+        tmp_path = f"{path}.tmp"
+        try:
+            # Written first: a crash leaves at worst an orphan .etag file
+            if etag:
+                with open(f"{path}.etag", "w") as f:
+                    f.write(etag)
+            else:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(f"{path}.etag")
+            with open(tmp_path, "wb") as f:
+                # Fast level: most of the gain at a fraction of the CPU
+                f.write(
+                    gzip.compress(raw, compresslevel=self._CACHE_COMPRESS_LEVEL)
                 )
-                return None
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.helper.connector_logger.warning(
+                f"[VigilIntel] Failed to write cache entry {path}: {e}"
+            )
 
-            response.raise_for_status()
-            return response.json()
+    def _prune_cache(self) -> None:
+        """Delete cache entries that are too old to be reused.
 
-        except requests.exceptions.JSONDecodeError:
+        Only files named like our own entries are touched: ``cache_dir``
+        may be a shared directory.
+        """
+        if not self.cache_dir:
+            return
+        now = time.time()
+        try:
+            # The directory may have been wiped since startup (tmpfs,
+            # remounted volume): recreate it so this run can still cache.
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if not self._CACHE_ENTRY.fullmatch(entry.name):
+                        continue
+                    try:
+                        if now - entry.stat().st_mtime >= self._CACHE_MAX_AGE:
+                            os.remove(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            self.helper.connector_logger.warning(
+                f"[VigilIntel] Cannot prune cache directory {self.cache_dir}: {e}"
+            )
+
+    # ─── Download & validate ──────────────────────────────────────────
+
+    def _parse_report(self, raw: bytes, source: str) -> dict | object | None:
+        """Parse a raw report body, or return ``None`` if it is not JSON.
+
+        Bodies without a ``"type": "bundle"`` marker near either end are
+        rejected before the full parse and reported as ``_INVALID``.  Both
+        ends are checked because serializers that sort keys put ``type``
+        after ``objects``.
+        """
+        window = self._BUNDLE_MARKER_WINDOW
+        if not (
+            self._BUNDLE_MARKER.search(raw, 0, window)
+            or self._BUNDLE_MARKER.search(raw, max(len(raw) - window, 0))
+        ):
+            return self._INVALID
+
+        try:
+            return _json_loads(raw)
+        except _JSON_DECODE_ERRORS:
             self.helper.connector_logger.error(
-                f"[VigilIntel] Invalid JSON received from {url}"
+                f"[VigilIntel] Invalid JSON received from {source}"
             )
             return None
-        except requests.exceptions.RequestException as e:
+
+    async def _download_report(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        url: str,
+        etag: str | None = None,
+    ) -> tuple[dict | object | None, bytes | None, str | None]:
+        """Download a STIX bundle from the given URL.
+
+        ``semaphore`` bounds concurrent requests; it is held per attempt
+        only, so a report backing off between retries frees its slot.
+
+        When ``etag`` is given, the request is made conditional and an
+        unchanged report short-circuits before its body is read.
+
+        Returns a ``(bundle, raw, etag)`` tuple where ``bundle`` is the
+        parsed JSON dict, ``_NOT_MODIFIED`` on a 304, ``_INVALID`` when
+        the body is not a STIX bundle, ``_FAILED`` when a transient error
+        outlasted the retries, or ``None`` when the report is missing or
+        unusable, and ``raw`` is the undecoded body it was parsed from.
+        """
+        headers = {"If-None-Match": etag} if etag else None
+        error = ""
+        self.helper.connector_logger.info(f"[VigilIntel] Fetching {url}")
+
+        for attempt in range(self._MAX_RETRIES + 1):
+            if attempt:
+                delay = self._RETRY_BACKOFF * 2 ** (attempt - 1)
+                self.helper.connector_logger.warning(
+                    f"[VigilIntel] {error} fetching {url} — retry "
+                    f"{attempt}/{self._MAX_RETRIES} in {delay:g}s"
+                )
+                await asyncio.sleep(delay)
+
+            try:
+                async with semaphore, session.get(
+                    url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)
+                ) as response:
+                    if response.status == 304:
+                        return self._NOT_MODIFIED, None, etag
+
+                    # Permanent: the report does not exist (yet)
+                    if response.status == 404:
+                        self.helper.connector_logger.warning(
+                            f"[VigilIntel] Report not found (404): {url}"
+                        )
+                        return None, None, None
+
+                    # Transient server-side failure: retry with backoff
+                    if response.status in self._RETRY_STATUSES:
+                        error = f"HTTP {response.status}"
+                        continue
+
+                    response.raise_for_status()
+                    # Drain the (transparently decompressed) body stream as
+                    # raw bytes — no charset detection, no copy cached on
+                    # the response.
+                    raw = await response.content.read()
+                    new_etag = response.headers.get("ETag")
+                    break
+
+            except aiohttp.ClientResponseError as e:
+                # Any other HTTP error status is not worth retrying
+                self.helper.connector_logger.error(
+                    f"[VigilIntel] HTTP error fetching {url}: {e}"
+                )
+                return None, None, None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"Network error ({str(e) or type(e).__name__})"
+        else:
             self.helper.connector_logger.error(
-                f"[VigilIntel] Network error fetching {url}: {e}"
+                f"[VigilIntel] {error} fetching {url} — giving up after "
+                f"{self._MAX_RETRIES} retries"
             )
+            return self._FAILED, None, None
+
+        # Parse once the connection is back in the pool
+        bundle = self._parse_report(raw, url)
+        if bundle is None or bundle is self._INVALID:
+            return bundle, None, None
+        return bundle, raw, new_etag
+
+    async def _download_reports(
+        self, dates: list[date], urls: list[str], etags: dict[str, str]
+    ) -> list[
+        tuple[dict | object | None, bytes | None, str | None] | BaseException
+    ]:
+        """Download the reports for all given dates concurrently.
+
+        ``urls`` holds the report URL of each date, as built by
+        ``_build_url``.
+
+        ``etags`` maps ``YYYY-MM-DD`` dates to the ETag of the last
+        imported report.  Fresh cache entries are used instead of the
+        network when ``cache_dir`` is set.  Results are returned in the
+        same order as ``dates``; at most ``_MAX_CONCURRENT_DOWNLOADS``
+        requests are in flight at once.
+        """
+        await asyncio.to_thread(self._prune_cache)
+        semaphore = asyncio.Semaphore(self._MAX_CONCURRENT_DOWNLOADS)
+
+        # One pooled, keep-alive session per run: the TCP + TLS handshake
+        # with the report host is paid once and reused for every date.
+        connector = aiohttp.TCPConnector(
+            limit=self._CONNECTION_POOL_SIZE,
+            limit_per_host=self._CONNECTION_POOL_SIZE,
+            ttl_dns_cache=300,
+        )
+        async with aiohttp.ClientSession(
+            connector=connector, headers=self._HTTP_HEADERS
+        ) as session:
+
+            async def bounded_download(target_date: date, url: str):
+                etag = etags.get(target_date.isoformat())
+
+                # A held ETag means the report was imported already: ask the
+                # server whether it changed rather than trusting the cache.
+                # Disk I/O and (de)compression run off the event loop so
+                # they don't stall the other downloads.
+                cached = (
+                    None
+                    if etag
+                    else await asyncio.to_thread(self._read_cache, target_date)
+                )
+                if cached is not None:
+                    raw, cached_etag = cached
+                    path = self._cache_path(target_date)
+                    self.helper.connector_logger.info(
+                        f"[VigilIntel] Using cached report {path}"
+                    )
+                    bundle = self._parse_report(raw, path)
+                    # A corrupt entry falls back to the network
+                    if bundle is not None and bundle is not self._INVALID:
+                        return bundle, raw, cached_etag
+
+                result = await self._download_report(
+                    session, semaphore, url, etag
+                )
+                _, raw, new_etag = result
+                if raw is not None:
+                    await asyncio.to_thread(
+                        self._write_cache, target_date, raw, new_etag
+                    )
+                return result
+
+            tasks = list(map(bounded_download, dates, urls))
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _extract_objects(bundle: dict) -> list | None:
+        """Perform minimal validation on a STIX 2.x bundle.
+
+        Returns the bundle's ``objects`` list, or ``None`` if it is invalid.
+        """
+        if not isinstance(bundle, dict) or bundle.get("type") != "bundle":
             return None
+        objects = bundle.get("objects")
+        return objects if isinstance(objects, list) else None
 
     @staticmethod
-    def _validate_stix_bundle(bundle: dict) -> bool:
-        """Perform minimal validation on a STIX 2.x bundle."""
-        if not isinstance(bundle, dict):
-            return False
-        if bundle.get("type") != "bundle":
-            return False
-        if "objects" not in bundle or not isinstance(bundle["objects"], list):
-            return False
-        return True
+    def _merge_bundles(object_lists: list[list]) -> dict:
+        """Combine the objects of several bundles into a single bundle.
+
+        Objects sharing an ``id`` are deduplicated, the last occurrence
+        (i.e. the most recent report) winning.
+        """
+        objects_by_id = {}
+        for objects in object_lists:
+            for obj in objects:
+                key = obj.get("id") if isinstance(obj, dict) else None
+                objects_by_id[key if key is not None else id(obj)] = obj
+        return {
+            "type": "bundle",
+            "id": f"bundle--{uuid.uuid4()}",
+            "objects": list(objects_by_id.values()),
+        }
 
     # ─── Ingestion ────────────────────────────────────────────────────
 
-    def _send_to_opencti(self, bundle: dict, work_id: str) -> bool:
+    def _send_to_opencti(self, bundle: dict | bytes, work_id: str) -> bool:
         """Serialize the STIX bundle and send it to OpenCTI.
 
+        ``bundle`` may also be the raw JSON bytes of an unmodified bundle,
+        which are forwarded as-is without a parse/serialize round-trip.
+
         Returns True on success, False on failure.
         """
         try:
-            serialized = json.dumps(bundle)
+            if isinstance(bundle, bytes):
+                serialized = bundle.decode("utf-8")
+            else:
+                serialized = _json_dumps(bundle)
             self.helper.send_stix2_bundle(
                 serialized,
                 update=True,
@@ -206,11 +586,73 @@ class VigilIntelConnector:
             )
             return False
 
+    def _submit_bundles(self, bundles: list[tuple], work_id: str) -> bool:
+        """Send validated ``(date, objects, raw, etag)`` bundles as one.
+
+        Returns True on success, False on failure.
+        """
+        if len(bundles) == 1:
+            # A lone bundle is forwarded untouched: send the downloaded
+            # bytes rather than re-serializing the parsed dict.
+            _, _, payload, _ = bundles[0]
+        else:
+            payload = self._merge_bundles([objects for _, objects, _, _ in bundles])
+            self.helper.connector_logger.info(
+                f"[VigilIntel] Merged {len(bundles)} bundles into one "
+                f"({len(payload['objects'])} unique objects)."
+            )
+        return self._send_to_opencti(payload, work_id)
+
+    # ─── State ────────────────────────────────────────────────────────
+
+    def _save_state(self, last_processed_date: date, etags: dict[str, str]) -> None:
+        """Persist the last processed date and the known report ETags."""
+        # Only keep ETags for dates still inside the lookback window
+        cutoff = (
+            datetime.now(timezone.utc).date() - timedelta(days=self.lookback_days)
+        ).isoformat()
+        # Persisted as a UTC midnight timestamp, as before
+        last_processed = datetime.combine(
+            last_processed_date, datetime.min.time(), tzinfo=timezone.utc
+        )
+        self.helper.set_state(
+            {
+                "last_processed_date": last_processed.isoformat(),
+                "last_run": datetime.now(timezone.utc).isoformat(),
+                "etags": {d: e for d, e in etags.items() if d >= cutoff},
+            }
+        )
+        self.helper.connector_logger.info(
+            f"[VigilIntel] State updated — last_processed_date={last_processed_date.isoformat()}"
+        )
+
     # ─── Main processing loop ─────────────────────────────────────────
 
-    def _process_dates(self) -> None:
-        """Core logic: compute dates, fetch, validate, ingest."""
+    def _initiate_work(self) -> str:
+        """Open an OpenCTI work item for this run and return its id."""
+        friendly_name = (
+            f"VigilIntel run @ {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}"
+        )
+        return self.helper.api.work.initiate_work(
+            self.helper.connect_id, friendly_name
+        )
+
+    async def _process_dates_async(self) -> None:
+        """Core logic: compute dates, fetch concurrently, validate, ingest."""
+        state = self.helper.get_state() or {}
+        etags = dict(state.get("etags") or {})
+        previous_date = self._read_last_processed_date(state)
+
         dates = self._compute_date_range()
+        has_new_dates = bool(dates)
+        recheck_dates = self._compute_recheck_dates(dates, etags)
+        if recheck_dates:
+            self.helper.connector_logger.info(
+                f"[VigilIntel] Re-checking {len(recheck_dates)} recent report(s) "
+                f"for updates: {', '.join(d.isoformat() for d in recheck_dates)}"
+            )
+            # Rechecked dates all precede the new ones: order is preserved
+            dates = recheck_dates + dates
         if not dates:
             return
 
@@ -220,25 +662,57 @@ class VigilIntelConnector:
         error_count = 0
         last_success_date = None
 
-        friendly_name = (
-            f"VigilIntel run @ {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}"
-        )
-        work_id = self.helper.api.work.initiate_work(
-            self.helper.connect_id, friendly_name
-        )
+        # A run that only re-probes recent reports opens a work only if a
+        # republished report actually needs submitting.
+        work_id = self._initiate_work() if has_new_dates else None
 
         self.helper.connector_logger.info(
             f"[VigilIntel] Processing {total} date(s)…"
         )
 
-        for idx, target_date in enumerate(dates, start=1):
-            date_str = target_date.strftime("%Y-%m-%d")
+        urls = list(map(self._build_url, dates))
+        results = await self._download_reports(dates, urls, etags)
+        valid_bundles = []
+        failed_dates = []
+
+        for idx, (target_date, result) in enumerate(zip(dates, results), start=1):
+            date_str = target_date.isoformat()
             self.helper.connector_logger.info(
                 f"[VigilIntel] [{idx}/{total}] Processing {date_str}…"
             )
 
-            url = self._build_url(target_date)
-            bundle = self._download_report(url)
+            if isinstance(result, BaseException):
+                self.helper.connector_logger.error(
+                    f"[VigilIntel] Unexpected error downloading {date_str}: {result}"
+                )
+                result = (self._FAILED, None, None)
+
+            bundle, raw, etag = result
+
+            if bundle is self._FAILED and target_date in recheck_dates:
+                # An optional re-probe: the report was imported already
+                self.helper.connector_logger.warning(
+                    f"[VigilIntel] Could not re-check {date_str} for updates — skipping."
+                )
+                skip_count += 1
+                continue
+
+            if bundle is self._FAILED:
+                # Unlike a 404, the report may well exist: retry next run
+                self.helper.connector_logger.error(
+                    f"[VigilIntel] Download failed for {date_str} — will retry next run."
+                )
+                error_count += 1
+                failed_dates.append(target_date)
+                continue
+
+            if bundle is self._NOT_MODIFIED:
+                self.helper.connector_logger.info(
+                    f"[VigilIntel] Report for {date_str} unchanged since last import (304) — skipping."
+                )
+                skip_count += 1
+                last_success_date = target_date
+                continue
 
             if bundle is None:
                 skip_count += 1
@@ -246,7 +720,10 @@ class VigilIntelConnector:
                 last_success_date = target_date
                 continue
 
-            if not self._validate_stix_bundle(bundle):
+            objects = (
+                None if bundle is self._INVALID else self._extract_objects(bundle)
+            )
+            if objects is None:
                 self.helper.connector_logger.error(
                     f"[VigilIntel] Invalid STIX bundle for {date_str} — skipping."
                 )
@@ -254,27 +731,48 @@ class VigilIntelConnector:
                 last_success_date = target_date
                 continue
 
-            nb_objects = len(bundle.get("objects", []))
+            nb_objects = len(objects)
             self.helper.connector_logger.info(
                 f"[VigilIntel] Valid STIX bundle for {date_str} — {nb_objects} objects."
             )
 
-            if self._send_to_opencti(bundle, work_id):
-                success_count += 1
-                last_success_date = target_date
+            valid_bundles.append((target_date, objects, raw, etag))
+
+        # The state may neither skip past a failed download (so the date is
+        # fetched again next run) nor move back before its previous value.
+        ceiling = failed_dates[0] - timedelta(days=1) if failed_dates else None
+
+        def state_date(day: date) -> date:
+            if ceiling is not None:
+                day = min(day, ceiling)
+            return max(day, previous_date) if previous_date else day
+
+        # ── Submit bundles, checkpointing state after each submission ─
+        last_saved_date = None
+        for start in range(0, len(valid_bundles), self.batch_size):
+            chunk = valid_bundles[start : start + self.batch_size]
+            if work_id is None:
+                work_id = self._initiate_work()
+            if self._submit_bundles(chunk, work_id):
+                success_count += len(chunk)
+                for target_date, _, _, etag in chunk:
+                    if etag:
+                        etags[target_date.isoformat()] = etag
+                newest = chunk[-1][0]
+                last_success_date = max(newest, last_success_date or newest)
+                # Persist progress now so a crash later in the run does not
+                # re-import this chunk.
+                last_saved_date = state_date(newest)
+                self._save_state(last_saved_date, etags)
             else:
-                error_count += 1
+                error_count += len(chunk)
 
         # ── Update connector state ────────────────────────────────────
+        # Also covers missing/invalid dates after the last submitted report
         if last_success_date is not None and success_count >= 1:
-            new_state = {
-                "last_processed_date": last_success_date.isoformat(),
-                "last_run": datetime.now(timezone.utc).isoformat(),
-            }
-            self.helper.set_state(new_state)
-            self.helper.connector_logger.info(
-                f"[VigilIntel] State updated — last_processed_date={last_success_date.strftime('%Y-%m-%d')}"
-            )
+            last_success_date = state_date(last_success_date)
+            if last_success_date != last_saved_date:
+                self._save_state(last_success_date, etags)
 
         # ── Finalize work ─────────────────────────────────────────────
         message = (
@@ -283,7 +781,8 @@ class VigilIntelConnector:
             f"(out of {total} dates)"
         )
         self.helper.connector_logger.info(f"[VigilIntel] {message}")
-        self.helper.api.work.to_processed(work_id, message)
+        if work_id is not None:
+            self.helper.api.work.to_processed(work_id, message)
 
     # ─── Scheduler entry-point ────────────────────────────────────────
 
@@ -291,9 +790,9 @@ class VigilIntelConnector:
         """Main loop — runs processing then sleeps for the configured interval."""
         self.helper.connector_logger.info("[VigilIntel] Connector started.")
 
-        while True:
+        while not self._shutdown.is_set():
             try:
-                self._process_dates()
+                asyncio.run(self._process_dates_async())
             except Exception as e:
                 self.helper.connector_logger.error(
                     f"[VigilIntel] Unexpected error during processing: {e}"
@@ -304,4 +803,11 @@ class VigilIntelConnector:
             self.helper.connector_logger.info(
                 f"[VigilIntel] Sleeping {self.interval_hours} hours until next run…"
             )
-            time.sleep(sleep_seconds)
+            if self._shutdown.wait(sleep_seconds):
+                break
+
+        self.helper.connector_logger.info("[VigilIntel] Connector stopped.")
+
+    def stop(self) -> None:
+        """Ask the main loop to exit, interrupting any pending sleep."""
+        self._shutdown.set()
@@ -1,5 +1,6 @@
 """VigilIntel STIX Importer - OpenCTI External Import Connector."""
 
+import signal
 import sys
 import os
 import traceback
@@ -9,6 +10,8 @@ from lib.vigilintel import VigilIntelConnector
 if __name__ == "__main__":
     try:
         connector = VigilIntelConnector()
+        # Let `docker stop` end the sleep between runs instead of waiting it out
+        signal.signal(signal.SIGTERM, lambda *_: connector.stop())
         connector.run()
     except Exception:
         traceback.print_exc()